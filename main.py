@@ -1,30 +1,109 @@
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
+import numpy as np
 import pandas as pd
 from PIL import Image, ImageOps
 import fitz  # PyMuPDF
 import pytesseract
-import io
+import hashlib
 import json
+import tempfile
+import gc
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Tesseract's internal OpenMP parallelism is slower than running several
+# single-threaded engines side by side, so cap it before any OCR happens
+# and let our own threads own the cores. setdefault keeps any value the
+# deployment environment has already chosen.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# tesserocr keeps the language model loaded in memory instead of launching a
+# new tesseract process per call. It needs the Tesseract C API at install time,
+# so fall back to pytesseract wherever it isn't available.
+try:
+    from tesserocr import PyTessBaseAPI, PSM, OEM
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# EasyOCR is an optional GPU-backed engine. It is deliberately not in
+# requirements.txt (Streamlit Cloud has no GPU); installing it next to the
+# app enables the engine choice in the sidebar.
+try:
+    import easyocr
+    EASYOCR_AVAILABLE = True
+except ImportError:
+    EASYOCR_AVAILABLE = False
+
+# --- IMPORTANT CHANGE FOR DEPLOYMENT ---
+# Using dpi=150 instead of 300 to reduce memory usage on cloud platforms.
+# This is the key to preventing memory-related crashes on Streamlit Cloud.
+DPI_SETTING = 150
+
+# Page segmentation modes offered per region. The user has already drawn a
+# tight box around one field, so Tesseract's full-page layout analysis
+# (the default PSM 3) is wasted work on these crops.
+PSM_CHOICES = {
+    "Single block": 6,
+    "Single line": 7,
+    "Single word": 8,
+}
+DEFAULT_PSM = 6
+
+# Recognition cost grows with pixel count, and printed text stays readable to
+# Tesseract well below this width, so very large crops (e.g. a box spanning a
+# whole page) are downsampled before OCR.
+MAX_OCR_WIDTH = 1600
+
+# Below this many crops, EasyOCR's sequential path beats the batched one
+# (batch setup and padding outweigh the kernel-launch savings).
+EASYOCR_BATCH_MIN = 16
 
 # --- Helper Functions ---
 
+# PyTessBaseAPI is not thread-safe, so each OCR worker thread gets its own
+# instance, created lazily per language and reused for every region after that.
+_tess_apis = threading.local()
+
+def get_tess_api(lang_code):
+    """Returns this thread's PyTessBaseAPI for the given language, creating it once."""
+    apis = getattr(_tess_apis, 'by_lang', None)
+    if apis is None:
+        apis = _tess_apis.by_lang = {}
+    if lang_code not in apis:
+        apis[lang_code] = PyTessBaseAPI(lang=lang_code, psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY)
+    return apis[lang_code]
+
+@st.cache_data(show_spinner=False, max_entries=4)
 def pdf_to_images(pdf_bytes):
-    """Converts a PDF file in bytes to a list of PIL Images."""
-    images = []
+    """Converts a PDF file in bytes to a list of uint8 NumPy page arrays.
+
+    Cached on the PDF bytes, so re-uploading the same file (including after
+    Clear and Restart) replays the rendered pages instead of rasterizing
+    again; max_entries keeps the cache from hoarding old documents.
+
+    Arrays are cheaper than PIL objects to keep in session state across
+    Streamlit reruns; the one page shown on the canvas is wrapped with
+    Image.fromarray at display time.
+    """
     try:
         pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        # --- IMPORTANT CHANGE FOR DEPLOYMENT ---
-        # Using dpi=150 instead of 300 to reduce memory usage on cloud platforms.
-        # This is the key to preventing memory-related crashes on Streamlit Cloud.
-        dpi_setting = 150
-        
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)
-            pix = page.get_pixmap(dpi=dpi_setting)
-            img_bytes = pix.tobytes("png")
-            image = Image.open(io.BytesIO(img_bytes))
-            images.append(image)
+
+        def render_page(page_num):
+            pix = pdf_document.load_page(page_num).get_pixmap(dpi=DPI_SETTING)
+            # Wrap the pixmap's own buffer directly instead of round-tripping
+            # every page through a PNG encode + decode. samples_mv is a view
+            # into the pixmap, so copy before the pixmap is freed.
+            arr = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+            return arr.copy()
+
+        # MuPDF releases the GIL while rendering, so pages rasterize in
+        # parallel across cores; executor.map keeps them in page order.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            images = list(executor.map(render_page, range(len(pdf_document))))
         pdf_document.close()
     except Exception as e:
         st.error(f"Error processing PDF: {e}")
@@ -32,45 +111,365 @@ def pdf_to_images(pdf_bytes):
     return images
 
 def preprocess_image(image, options):
-    """Applies selected pre-processing steps to a PIL image."""
+    """Applies selected pre-processing steps to a PIL image.
+
+    Oversize crops are also downsampled to MAX_OCR_WIDTH here, so every OCR
+    path (and the crop cache, which hashes the preprocessed pixels) sees the
+    same resized image.
+    """
     processed_image = image
-    if 'grayscale' in options:
+    if processed_image.width > MAX_OCR_WIDTH:
+        new_height = max(1, round(processed_image.height * MAX_OCR_WIDTH / processed_image.width))
+        processed_image = processed_image.resize(
+            (MAX_OCR_WIDTH, new_height), Image.Resampling.LANCZOS
+        )
+    if 'grayscale' in options and processed_image.mode != 'L':
         processed_image = ImageOps.grayscale(processed_image)
     if 'invert' in options:
         # Invert works best on grayscale images
         if processed_image.mode != 'L':
             processed_image = ImageOps.grayscale(processed_image)
-        processed_image = ImageOps.invert(processed_image)
+        # For 8-bit grayscale, inverting is just 255 - x; NumPy's bitwise-not
+        # does it in bulk SIMD instead of going through PIL's point machinery.
+        processed_image = Image.fromarray(np.bitwise_not(np.asarray(processed_image)))
     return processed_image
 
 
-def perform_ocr(image, bounding_box, language, preprocessing_options):
-    """Performs OCR on a cropped area of an image with pre-processing."""
+def get_lang_code(language):
+    """Maps the UI language choice to a Tesseract language code."""
+    if language == 'Hindi':
+        return 'hin'
+    if language == 'English + Hindi':
+        return 'eng+hin'
+    return 'eng'
+
+
+def perform_ocr(image, bounding_box, language, preprocessing_options, cache=None, psm=DEFAULT_PSM):
+    """Performs OCR on a cropped area of an image with pre-processing.
+
+    bounding_box is an integer (left, top, width, height) row, e.g. one row
+    of the scaled-boxes array built at extraction time.
+
+    When a cache dict is given, results are memoized by a digest of the
+    preprocessed crop pixels, so identical regions (logos, repeated headers,
+    boilerplate) across pages are only OCR'd once.
+    """
     try:
-        left, top, width, height = (
-            int(bounding_box['left']),
-            int(bounding_box['top']),
-            int(bounding_box['width']),
-            int(bounding_box['height'])
-        )
+        left, top, width, height = bounding_box
         if width > 0 and height > 0:
             cropped_image = image.crop((left, top, left + width, top + height))
-            
+
             # Apply selected pre-processing to the cropped image
             processed_crop = preprocess_image(cropped_image, preprocessing_options)
 
-            lang_code = 'eng'
-            if language == 'Hindi':
-                lang_code = 'hin'
-            elif language == 'English + Hindi':
-                lang_code = 'eng+hin'
-            
-            text = pytesseract.image_to_string(processed_crop, lang=lang_code)
-            return text.strip().replace('\n', ' ') # Clean up newlines
+            lang_code = get_lang_code(language)
+
+            cache_key = None
+            if cache is not None:
+                # blake2b is fast on modern CPUs and 16 bytes is plenty here.
+                digest = hashlib.blake2b(processed_crop.tobytes(), digest_size=16).digest()
+                cache_key = (digest, lang_code, tuple(preprocessing_options), psm)
+                if cache_key in cache:
+                    return cache[cache_key]
+
+            if TESSEROCR_AVAILABLE:
+                # Reuses an in-memory engine: no process launch and no
+                # traineddata reload per region.
+                api = get_tess_api(lang_code)
+                api.SetPageSegMode(psm)
+                api.SetImage(processed_crop)
+                text = api.GetUTF8Text()
+            else:
+                text = pytesseract.image_to_string(
+                    processed_crop, lang=lang_code, config=f"--psm {psm} --oem 1"
+                )
+            result = text.strip().replace('\n', ' ') # Clean up newlines
+            if cache_key is not None:
+                cache[cache_key] = result
+            return result
     except Exception as e:
         st.warning(f"Could not perform OCR on a region: {e}")
     return ""
 
+
+def ocr_page_regions(page_image, boxes, language, preprocessing_options, cache=None, psms=None):
+    """OCRs all regions of one page, returning one text per box.
+
+    With tesserocr this is a straight loop over the in-memory API. On the
+    pytesseract fallback, launching one tesseract process per region is the
+    dominant cost, so all crops are written out and fed to tesseract as a
+    single image-list file: one process launch per page instead of per region.
+    """
+    if psms is None:
+        psms = [DEFAULT_PSM] * len(boxes)
+
+    if TESSEROCR_AVAILABLE:
+        return [
+            perform_ocr(page_image, box, language, preprocessing_options, cache, psm)
+            for box, psm in zip(boxes, psms)
+        ]
+
+    lang_code = get_lang_code(language)
+    texts = [""] * len(boxes)
+    pending = []  # (box index, preprocessed crop, cache key)
+    for j, box in enumerate(boxes):
+        try:
+            left, top, width, height = box
+            if width <= 0 or height <= 0:
+                continue
+            crop = page_image.crop((left, top, left + width, top + height))
+            processed_crop = preprocess_image(crop, preprocessing_options)
+            cache_key = None
+            if cache is not None:
+                digest = hashlib.blake2b(processed_crop.tobytes(), digest_size=16).digest()
+                cache_key = (digest, lang_code, tuple(preprocessing_options), psms[j])
+                if cache_key in cache:
+                    texts[j] = cache[cache_key]
+                    continue
+            pending.append((j, processed_crop, cache_key))
+        except Exception as e:
+            st.warning(f"Could not perform OCR on a region: {e}")
+
+    # One image-list invocation covers one segmentation mode, so group the
+    # misses by their region's PSM (usually a single group).
+    by_psm = {}
+    for entry in pending:
+        by_psm.setdefault(psms[entry[0]], []).append(entry)
+
+    for psm, group in by_psm.items():
+        try:
+            # Prefer tmpfs so the crop round-trip never touches disk.
+            tmp_root = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            with tempfile.TemporaryDirectory(dir=tmp_root) as tmp_dir:
+                crop_paths = []
+                for j, processed_crop, _ in group:
+                    crop_path = os.path.join(tmp_dir, f"region_{j}.png")
+                    processed_crop.save(crop_path)
+                    crop_paths.append(crop_path)
+                manifest_path = os.path.join(tmp_dir, "regions.txt")
+                with open(manifest_path, "w") as manifest:
+                    manifest.write("\n".join(crop_paths))
+                raw = pytesseract.image_to_string(
+                    manifest_path, lang=lang_code, config=f"--psm {psm} --oem 1"
+                )
+            # Tesseract separates the per-image results with form feeds.
+            blocks = raw.split('\x0c')
+            for (j, _, cache_key), block in zip(group, blocks):
+                texts[j] = block.strip().replace('\n', ' ')
+                if cache_key is not None:
+                    cache[cache_key] = texts[j]
+        except Exception as e:
+            st.warning(f"Could not perform OCR on a page: {e}")
+    return texts
+
+
+def get_easyocr_reader(language):
+    """Returns a session-cached EasyOCR reader for the given language choice."""
+    lang_list = {'Hindi': ['hi'], 'English + Hindi': ['en', 'hi']}.get(language, ['en'])
+    readers = st.session_state.setdefault('easyocr_readers', {})
+    key = tuple(lang_list)
+    if key not in readers:
+        reader = easyocr.Reader(lang_list, cudnn_benchmark=True)
+        try:
+            # Warm-up batch so cuDNN autotuning doesn't land on the first
+            # real extraction.
+            reader.readtext_batched(np.zeros((32, 300, 800, 3), dtype=np.uint8), batch_size=32)
+        except Exception:
+            pass
+        readers[key] = reader
+    return readers[key]
+
+
+def extract_pages_easyocr(pdf_bytes, page_count, boxes, language, preprocessing_options, reader):
+    """Extracts all regions of all pages with EasyOCR in one batched GPU call.
+
+    Every crop is known up front, so the whole document becomes a single
+    readtext_batched invocation, amortizing kernel-launch overhead across
+    N pages x M regions. Small jobs fall back to sequential readtext, which
+    is faster below EASYOCR_BATCH_MIN crops. Returns the same page-ordered
+    structure as extract_pages_streaming.
+    """
+    num_boxes = len(boxes)
+    texts_flat = [""] * (page_count * num_boxes)
+    pending_indices, pending_crops = [], []
+
+    pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        for page_num in range(page_count):
+            pix = pdf_document.load_page(page_num).get_pixmap(dpi=DPI_SETTING)
+            # Zero-copy view is safe here: every crop below copies out of the
+            # page before the pixmap is replaced on the next iteration.
+            arr = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+            page_image = Image.fromarray(arr)
+            for j, box in enumerate(boxes):
+                left, top, width, height = box
+                if width <= 0 or height <= 0:
+                    continue
+                crop = page_image.crop((left, top, left + width, top + height))
+                processed_crop = preprocess_image(crop, preprocessing_options)
+                pending_indices.append(page_num * num_boxes + j)
+                pending_crops.append(np.asarray(processed_crop.convert('RGB')))
+    finally:
+        pdf_document.close()
+
+    if pending_crops:
+        if len(pending_crops) >= EASYOCR_BATCH_MIN:
+            results = reader.readtext_batched(
+                pending_crops, n_width=800, n_height=300, batch_size=32
+            )
+        else:
+            results = [reader.readtext(crop) for crop in pending_crops]
+        for flat_idx, detections in zip(pending_indices, results):
+            texts_flat[flat_idx] = " ".join(d[1] for d in detections)
+
+    return [
+        texts_flat[page_num * num_boxes:(page_num + 1) * num_boxes]
+        for page_num in range(page_count)
+    ]
+
+
+def pdf_has_text_layer(pdf_bytes):
+    """Returns True if any page of the PDF carries a real text layer."""
+    try:
+        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            return any(page.get_text().strip() for page in pdf_document)
+        finally:
+            pdf_document.close()
+    except Exception:
+        return False
+
+
+def extract_text_layer_regions(pdf_bytes, page_count, boxes):
+    """Reads region text straight from the PDF text layer, skipping OCR.
+
+    Boxes arrive in rendered-pixel space, so they are mapped back to PDF
+    points and matched against page.get_text(\"words\") bounding boxes. For
+    born-digital PDFs this replaces a Tesseract call per region with a
+    geometric filter. Returns the same page-ordered structure as
+    extract_pages_streaming.
+    """
+    scale = 72.0 / DPI_SETTING
+    page_texts = []
+    pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        for page_num in range(page_count):
+            words = pdf_document.load_page(page_num).get_text("words")
+            texts = []
+            for box in boxes:
+                left, top, width, height = box
+                region = fitz.Rect(
+                    left * scale,
+                    top * scale,
+                    (left + width) * scale,
+                    (top + height) * scale,
+                )
+                hits = [w for w in words if fitz.Rect(w[:4]).intersects(region)]
+                # Keep the document's own reading order: block, line, word.
+                hits.sort(key=lambda w: (w[5], w[6], w[7]))
+                texts.append(" ".join(w[4] for w in hits))
+            page_texts.append(texts)
+    finally:
+        pdf_document.close()
+    return page_texts
+
+
+def extract_pages_streaming(pdf_bytes, page_count, boxes, language, preprocessing_options, cache, psms=None):
+    """Rasterizes and OCRs all pages in an overlapped producer/consumer pipeline.
+
+    A producer thread renders pages one at a time while consumer threads OCR
+    completed pages, so only a handful of page bitmaps are ever alive at once.
+    Peak memory stays constant in the page count instead of growing linearly.
+    Returns a list with one ocr_page_regions result per page, in page order.
+    """
+    page_texts = [None] * page_count
+    page_queue = queue.Queue(maxsize=4)
+
+    # Both preprocessing options end up on a grayscale image anyway, so render
+    # straight to gray: 1 byte/pixel instead of 3 through the whole pipeline,
+    # and no per-crop grayscale conversion later.
+    colorspace = (
+        fitz.csGRAY
+        if ('grayscale' in preprocessing_options or 'invert' in preprocessing_options)
+        else fitz.csRGB
+    )
+
+    def produce():
+        try:
+            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            try:
+                for page_num in range(page_count):
+                    pix = pdf_document.load_page(page_num).get_pixmap(
+                        dpi=DPI_SETTING, colorspace=colorspace
+                    )
+                    # The queued image outlives this pixmap, so copy out of
+                    # the samples_mv view before the next iteration frees it.
+                    arr = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+                    if pix.n == 1:
+                        arr = arr[:, :, 0]
+                    page_queue.put((page_num, Image.fromarray(arr.copy())))
+                    if (page_num + 1) % 8 == 0:
+                        gc.collect()
+            finally:
+                pdf_document.close()
+        finally:
+            page_queue.put(None)
+
+    def consume():
+        while True:
+            item = page_queue.get()
+            if item is None:
+                # Re-post the sentinel so the other consumers stop too.
+                page_queue.put(None)
+                return
+            page_num, page_image = item
+            page_texts[page_num] = ocr_page_regions(
+                page_image, boxes, language, preprocessing_options, cache, psms
+            )
+            del page_image
+
+    producer = threading.Thread(target=produce, daemon=True)
+    consumers = [
+        threading.Thread(target=consume, daemon=True)
+        for _ in range(min(os.cpu_count() or 1, page_count))
+    ]
+    producer.start()
+    for consumer in consumers:
+        consumer.start()
+    producer.join()
+    for consumer in consumers:
+        consumer.join()
+    return page_texts
+
+@st.cache_data(show_spinner=False)
+def derive_boxes(regions_json, canvas_w, canvas_h, original_w, original_h,
+                 field_names_json, field_psms_json):
+    """Derives the integer box array, field names, and PSMs for extraction.
+
+    Takes the canvas regions and per-field settings as JSON strings so
+    st.cache_data can hash them; an unchanged template means the scaling
+    walk over the regions is replayed from cache instead of re-run.
+    """
+    regions = json.loads(regions_json)
+    field_names = json.loads(field_names_json)
+    field_psms = json.loads(field_psms_json)
+    scale_w = original_w / canvas_w
+    scale_h = original_h / canvas_h
+
+    scaled_boxes, field_names_list, psm_list = [], [], []
+    for i, region in enumerate(regions):
+        region_key = f"region_{i}_{int(region['left'])}_{int(region['top'])}"
+        field_names_list.append(field_names.get(region_key, f"Field_{i+1}"))
+        psm_list.append(field_psms.get(region_key, DEFAULT_PSM))
+        scaled_boxes.append([
+            region["left"]*scale_w, region["top"]*scale_h,
+            region["width"]*scale_w, region["height"]*scale_h
+        ])
+    # Integerize once into one (M, 4) array of (left, top, width, height)
+    # rows; the OCR paths just unpack rows on the hot path.
+    boxes_np = np.array(scaled_boxes, dtype=np.int32).reshape(-1, 4)
+    return boxes_np, field_names_list, psm_list
+
 # --- Streamlit App ---
 
 st.set_page_config(layout="wide")
@@ -81,12 +480,20 @@ st.markdown("Upload a PDF, define data fields (or load a template), and extract
 # --- Session State Initialization ---
 if 'pdf_images' not in st.session_state:
     st.session_state.pdf_images = []
+if 'pdf_bytes' not in st.session_state:
+    st.session_state.pdf_bytes = None
+if 'pdf_has_text' not in st.session_state:
+    st.session_state.pdf_has_text = False
 if 'extracted_data' not in st.session_state:
     st.session_state.extracted_data = None
 if 'field_names' not in st.session_state:
     st.session_state.field_names = {}
+if 'field_psms' not in st.session_state:
+    st.session_state.field_psms = {}
 if 'canvas_json' not in st.session_state:
     st.session_state.canvas_json = None
+if 'ocr_cache' not in st.session_state:
+    st.session_state.ocr_cache = {}
 
 
 # --- Sidebar ---
@@ -103,7 +510,9 @@ with st.sidebar:
 
     if uploaded_file and not st.session_state.pdf_images:
         with st.spinner("Processing PDF... (This may take a moment)"):
-            st.session_state.pdf_images = pdf_to_images(uploaded_file.getvalue())
+            st.session_state.pdf_bytes = uploaded_file.getvalue()
+            st.session_state.pdf_has_text = pdf_has_text_layer(st.session_state.pdf_bytes)
+            st.session_state.pdf_images = pdf_to_images(st.session_state.pdf_bytes)
         if st.session_state.pdf_images:
             st.success(f"PDF processed: {len(st.session_state.pdf_images)} pages.")
         else:
@@ -115,6 +524,14 @@ with st.sidebar:
         language = st.selectbox("2. Select OCR Language", ('English', 'Hindi', 'English + Hindi'))
         st.session_state.language = language
 
+        if EASYOCR_AVAILABLE:
+            st.session_state.ocr_engine = st.selectbox(
+                "OCR Engine", ('Tesseract', 'EasyOCR (GPU)'),
+                help="EasyOCR batches all crops into one GPU inference pass."
+            )
+        else:
+            st.session_state.ocr_engine = 'Tesseract'
+
         # 3. Image Pre-processing
         st.session_state.preprocessing_options = st.multiselect(
             "3. Image Pre-processing (for better OCR)",
@@ -131,6 +548,7 @@ with st.sidebar:
             template_data = json.load(uploaded_template)
             st.session_state.canvas_json = template_data.get("regions", None)
             st.session_state.field_names = template_data.get("field_names", {})
+            st.session_state.field_psms = template_data.get("field_psms", {})
             st.success("Template loaded!")
             st.rerun()
 
@@ -147,7 +565,8 @@ if st.session_state.pdf_images:
             "Select page to use as template", 1, len(st.session_state.pdf_images), 1
         ) - 1
 
-        bg_image = st.session_state.pdf_images[page_to_preview]
+        # Only the previewed page needs to be a PIL Image, for the canvas.
+        bg_image = Image.fromarray(st.session_state.pdf_images[page_to_preview])
         canvas_width = 800
         canvas_height = canvas_width * (bg_image.height / bg_image.width)
 
@@ -172,19 +591,34 @@ if st.session_state.pdf_images:
             regions = st.session_state.canvas_json["objects"]
             
             with st.form(key="field_names_form"):
+                psm_labels = list(PSM_CHOICES)
                 for i, region in enumerate(regions):
                     region_key = f"region_{i}_{int(region['left'])}_{int(region['top'])}"
                     default_name = st.session_state.field_names.get(region_key, f"Field_{i+1}")
                     st.session_state.field_names[region_key] = st.text_input(
                         f"Name for Region {i+1}", value=default_name, key=f"field_name_{i}"
                     )
+                    saved_psm = st.session_state.field_psms.get(region_key, DEFAULT_PSM)
+                    default_label = next(
+                        (label for label, psm in PSM_CHOICES.items() if psm == saved_psm),
+                        psm_labels[0],
+                    )
+                    chosen_label = st.selectbox(
+                        f"Layout of Region {i+1}",
+                        psm_labels,
+                        index=psm_labels.index(default_label),
+                        key=f"field_psm_{i}",
+                        help="Tells the OCR engine what the region contains, skipping page layout analysis.",
+                    )
+                    st.session_state.field_psms[region_key] = PSM_CHOICES[chosen_label]
                 if st.form_submit_button("Save Field Names"):
                     st.success("Field names saved!")
 
             # Template Download
             template_to_save = {
                 "regions": st.session_state.canvas_json,
-                "field_names": st.session_state.field_names
+                "field_names": st.session_state.field_names,
+                "field_psms": st.session_state.field_psms
             }
             st.download_button(
                 label="📥 Save as Template",
@@ -196,28 +630,50 @@ if st.session_state.pdf_images:
             st.subheader("Step 3: Extract Data")
             if st.button("🚀 Extract Data from All Pages", type="primary"):
                 original_w, original_h = bg_image.size
-                scale_w = original_w / canvas_width
-                scale_h = original_h / canvas_height
-                
-                scaled_boxes, field_names_list = [], []
-
-                for i, region in enumerate(regions):
-                    region_key = f"region_{i}_{int(region['left'])}_{int(region['top'])}"
-                    field_names_list.append(st.session_state.field_names.get(region_key, f"Field_{i+1}"))
-                    scaled_boxes.append({
-                        "left": region["left"]*scale_w, "top": region["top"]*scale_h,
-                        "width": region["width"]*scale_w, "height": region["height"]*scale_h
-                    })
+                boxes_np, field_names_list, psm_list = derive_boxes(
+                    json.dumps(regions, sort_keys=True),
+                    canvas_width, canvas_height,
+                    original_w, original_h,
+                    json.dumps(st.session_state.field_names, sort_keys=True),
+                    json.dumps(st.session_state.field_psms, sort_keys=True),
+                )
 
                 with st.spinner("Extracting data from all pages... This can take a while."):
-                    all_pages_data = []
-                    for i, page_image in enumerate(st.session_state.pdf_images):
-                        page_data = {"Page": i + 1}
-                        for j, box in enumerate(scaled_boxes):
-                            field_name = field_names_list[j]
-                            page_data[field_name] = perform_ocr(page_image, box, st.session_state.language, st.session_state.preprocessing_options)
-                        all_pages_data.append(page_data)
-                    st.session_state.extracted_data = pd.DataFrame(all_pages_data)
+                    if st.session_state.pdf_has_text:
+                        # Born-digital PDF: read the text layer directly, no OCR.
+                        page_texts = extract_text_layer_regions(
+                            st.session_state.pdf_bytes,
+                            len(st.session_state.pdf_images),
+                            boxes_np,
+                        )
+                    elif st.session_state.ocr_engine == 'EasyOCR (GPU)':
+                        page_texts = extract_pages_easyocr(
+                            st.session_state.pdf_bytes,
+                            len(st.session_state.pdf_images),
+                            boxes_np,
+                            st.session_state.language,
+                            st.session_state.preprocessing_options,
+                            get_easyocr_reader(st.session_state.language),
+                        )
+                    else:
+                        page_texts = extract_pages_streaming(
+                            st.session_state.pdf_bytes,
+                            len(st.session_state.pdf_images),
+                            boxes_np,
+                            st.session_state.language,
+                            st.session_state.preprocessing_options,
+                            st.session_state.ocr_cache,
+                            psm_list,
+                        )
+
+                    # Build columns directly instead of a list of per-page row
+                    # dicts, so pandas skips the dict-to-column pivot.
+                    results = {"Page": list(range(1, len(page_texts) + 1))}
+                    for j, field_name in enumerate(field_names_list):
+                        results[field_name] = [
+                            texts[j] if texts else "" for texts in page_texts
+                        ]
+                    st.session_state.extracted_data = pd.DataFrame(results)
                 
                 st.success("Data extraction complete!")
 